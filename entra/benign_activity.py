@@ -3,7 +3,6 @@
 import argparse
 from entra_simulator import EntraLogSimulator
 from datetime import datetime, timezone
-import json
 
 def main():
     parser = argparse.ArgumentParser(description="Generate benign Entra ID activity logs.")
@@ -29,17 +28,18 @@ def main():
         output_file=args.output
     )
 
-    logs = simulator.generate_logs(
-        total_logs=args.total_logs,
-        simulate_start_time=datetime.now(timezone.utc),
-        include_failures=True  # allows benign InteractiveUserSignIn failures
-    )
-
-    with open(args.output, "w") as out_file:
-        for log in logs:
-            out_file.write(f"{json.dumps(log)}\n")
-
-    print(f"[+] Generated {len(logs)} benign logs to {args.output}")
+    total = 0
+    with open(args.output, "w", buffering=1024 * 1024, encoding="utf-8", newline="\n") as out_file:
+        for line in simulator.iter_log_lines(
+            total_logs=args.total_logs,
+            simulate_start_time=datetime.now(timezone.utc),
+            include_failures=True  # allows benign InteractiveUserSignIn failures
+        ):
+            out_file.write(line)
+            out_file.write("\n")
+            total += 1
+
+    print(f"[+] Generated {total} benign logs to {args.output}")
 
 if __name__ == "__main__":
     main()
@@ -1,10 +1,148 @@
-import json
+import calendar
+import itertools
+import os
+import re
+import shutil
+import time
 import yaml
-import uuid
 import random
+from concurrent.futures import ProcessPoolExecutor
+
+import fastjson
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List
 
+try:
+    from yaml import CSafeLoader as _YamlLoader  # libyaml, ~5-10x faster
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# Parsed configs keyed by (path, mtime_ns) so every simulator built in the
+# same process reuses them instead of re-reading identical files.
+_YAML_CACHE = {}
+_TEMPLATE_CACHE = {}
+
+
+class _ConfigRecord:
+    """Fixed-shape record for an entity loaded from the YAML configs.
+
+    __slots__ storage keeps per-entity memory low and field access off the
+    dict hash path. A thin mapping interface (get/[]/copy) is kept because
+    the injection scripts look entities up by key and layer overrides on
+    top of a plain-dict copy.
+    """
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        unknown = fields.keys() - set(self.__slots__)
+        if unknown:
+            # A key outside the declared slots would otherwise be dropped
+            # silently, changing rendered output without any error.
+            raise TypeError(
+                f"{type(self).__name__} got unexpected config "
+                f"key(s): {', '.join(sorted(unknown))}"
+            )
+        for name in self.__slots__:
+            if name in fields:
+                setattr(self, name, fields[name])
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return hasattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def copy(self) -> Dict:
+        return {
+            name: getattr(self, name)
+            for name in self.__slots__ if hasattr(self, name)
+        }
+
+
+class User(_ConfigRecord):
+    __slots__ = (
+        "user_id", "roles", "user_type", "device_id", "hostname", "os",
+        "browser", "user_agent", "ip", "city", "country", "asn", "asn_name",
+        "is_proxy",
+        # Optional per-user mail-event fields read by _entity_fragment.
+        "email_sender", "email_subject", "email_url"
+    )
+
+
+class ServicePrincipal(_ConfigRecord):
+    __slots__ = (
+        "app_id", "display_name", "client_ip", "city", "country", "asn",
+        "asn_name", "is_proxy", "user_agent", "device_id"
+    )
+
+
+def _load_yaml_cached(filepath: str) -> Dict:
+    key = (filepath, os.stat(filepath).st_mtime_ns)
+    cached = _YAML_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    # Cross-process cache: a sidecar JSON written on first parse. C-level
+    # JSON decoding is far cheaper than YAML parsing, so repeated script
+    # invocations skip PyYAML entirely until the YAML file changes.
+    sidecar = filepath + ".cache.json"
+    try:
+        with open(sidecar, "rb") as f:
+            envelope = fastjson.loads(f.read())
+        if envelope.get("mtime_ns") == key[1]:
+            data = envelope["data"]
+            _YAML_CACHE[key] = data
+            return data
+    except (OSError, ValueError):
+        pass
+
+    with open(filepath, "r") as f:
+        data = yaml.load(f, Loader=_YamlLoader)
+    _YAML_CACHE[key] = data
+    try:
+        with open(sidecar, "wb") as f:
+            f.write(fastjson.dumps_bytes({"mtime_ns": key[1], "data": data}))
+    except OSError:
+        pass  # read-only config dir; in-process cache still applies
+    return data
+
+
+def iso_utc(dt) -> str:
+    """Format a UTC datetime as "%Y-%m-%dT%H:%M:%SZ" straight from the
+    struct fields, skipping strftime's locale machinery."""
+    return (
+        f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}"
+        f"T{dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}Z"
+    )
+
+
+def fast_uuid4() -> str:
+    """A random UUID4 string without the uuid.UUID object round-trip.
+
+    os.urandom goes straight to getrandom(2) and .hex() is C; only the
+    version/variant bits and the dash layout are done in Python.
+    """
+    b = bytearray(os.urandom(16))
+    b[6] = (b[6] & 0x0F) | 0x40
+    b[8] = (b[8] & 0x3F) | 0x80
+    h = b.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def load_users(users_file="/home/spen/entra_logs/configs/users.yaml") -> List[User]:
+    """Load just the user records, for scripts that only need a name lookup.
+
+    Skips the five other config parses a full EntraLogSimulator pays for;
+    goes through the same module-level YAML cache.
+    """
+    return [User(**u) for u in _load_yaml_cached(users_file)["users"]]
+
 
 class EntraLogSimulator:
     def __init__(
@@ -25,12 +163,48 @@ class EntraLogSimulator:
         self.operations_file = operations_file
         self.output_file = output_file
 
-        self.users = self._load_yaml(self.users_file)["users"]
-        self.service_principals = self._load_yaml(self.service_principals_file)["service_principals"]
+        self.users = [User(**u) for u in self._load_yaml(self.users_file)["users"]]
+        self._user_index = {u.user_id: u for u in self.users}
+        self.service_principals = [
+            ServicePrincipal(**s)
+            for s in self._load_yaml(self.service_principals_file)["service_principals"]
+        ]
         self.template = self._load_template()
+        self._placeholder_re = re.compile(r"\{\{\s*([a-zA-Z_]+)\s*\}\}")
+        # Parse the template JSON once with sentinel strings in place of the
+        # placeholders, and record the path of every placeholder leaf.
+        # Rendering then deep-copies the skeleton and patches those leaves,
+        # with no JSON parse per log.
+        self._template_obj = fastjson.loads(self._sentinel_template())
+        self._placeholder_paths = []
+        self._collect_placeholder_paths(self._template_obj, ())
+        self._copy_skeleton = self._compile_skeleton_copier(self._template_obj)
+        # {name}-style variant for the write-only fast path: compact
+        # single-line JSON with literal braces escaped and placeholders
+        # reduced to bare names, so one C-level str.format_map call yields
+        # a finished JSONL line. Placeholders that sat outside quotes in
+        # the template (the roles list) stay unquoted here too.
+        compact = fastjson.dumps(self._template_obj)
+        compact = compact.replace("{", "{{").replace("}", "}}")
+        self._format_template = re.sub(
+            r'"__PH_(\w+)__"',
+            lambda m: "{%s}" % m.group(1)
+            if m.group(1) in self._bare_placeholders else '"{%s}"' % m.group(1),
+            compact
+        )
         self.org_config = self._load_yaml(self.org_config_file)
         self.app_id_map = self._load_yaml(self.apps_file)["apps"]
         self.operations = self._load_yaml(self.operations_file)["operations"]
+        self._user_ops = [op for op in self.operations if "ServicePrincipal" not in op["name"]]
+        self._spn_ops = [op for op in self.operations if "ServicePrincipal" in op["name"]]
+
+        # Entity-derived replacement values never change between logs, so
+        # compute them once per entity, keyed by object identity. Users are
+        # precomputed eagerly; SPN fragments fill in on first render. Ad-hoc
+        # entities from the injection scripts (copies carrying overrides)
+        # miss the cache and get a fresh fragment, never a stale one.
+        self._frag_cache = {id(u): self._entity_fragment(u) for u in self.users}
+        self._spn_entity_ids = {id(s) for s in self.service_principals}
 
         self.operation_resource_map = {
             "InteractiveUserSignIn": "UserAccount",
@@ -55,22 +229,136 @@ class EntraLogSimulator:
             "ConsentToApp": "UserAccount"
         }
 
+        self._user_replacements, self._spn_replacements = self._compile_fast_replacements()
+
     def _load_yaml(self, filepath: str) -> Dict:
-        with open(filepath, "r") as f:
-            return yaml.safe_load(f)
+        return _load_yaml_cached(filepath)
+
+    def _sentinel_template(self) -> str:
+        # Rewrite "{{ name }}" to a "__PH_name__" sentinel that is valid JSON
+        # in the placeholder's position. Placeholders inside a quoted string
+        # stay bare; unquoted ones (e.g. the roles list) gain quotes.
+        parts = self._placeholder_re.split(self.template)
+        self._bare_placeholders = set()
+        out = []
+        for i, part in enumerate(parts):
+            if i & 1:
+                quoted = parts[i - 1].endswith('"')
+                if not quoted:
+                    self._bare_placeholders.add(part)
+                out.append("__PH_%s__" % part if quoted else '"__PH_%s__"' % part)
+            else:
+                out.append(part)
+        return "".join(out)
+
+    @classmethod
+    def _compile_skeleton_copier(cls, node):
+        # copy.deepcopy walks the skeleton generically (memo dict, type
+        # dispatch) on every render. The skeleton's shape is fixed, so
+        # compile a nested constructor for it once; leaves are immutable
+        # and can be shared.
+        if isinstance(node, dict):
+            makers = [(k, cls._compile_skeleton_copier(v)) for k, v in node.items()]
+            return lambda: {k: m() for k, m in makers}
+        if isinstance(node, list):
+            makers = [cls._compile_skeleton_copier(v) for v in node]
+            return lambda: [m() for m in makers]
+        return lambda: node
+
+    def _collect_placeholder_paths(self, node, path):
+        if isinstance(node, dict):
+            items = node.items()
+        elif isinstance(node, list):
+            items = enumerate(node)
+        else:
+            return
+        for key, value in items:
+            if isinstance(value, str) and value.startswith("__PH_") and value.endswith("__"):
+                self._placeholder_paths.append((path + (key,), value[5:-2]))
+            else:
+                self._collect_placeholder_paths(value, path + (key,))
 
     def _load_template(self) -> str:
+        key = (self.template_file, os.stat(self.template_file).st_mtime_ns)
+        cached = _TEMPLATE_CACHE.get(key)
+        if cached is not None:
+            return cached
         with open(self.template_file, "r") as f:
-            return f.read()
+            raw = f.read()
+        _TEMPLATE_CACHE[key] = raw
+        return raw
 
-    def _render_template(
+    @staticmethod
+    def _format_utc(epoch: int) -> str:
+        # Fixed "%Y-%m-%dT%H:%M:%SZ" layout without strftime's locale
+        # machinery or a datetime object per log.
+        t = time.gmtime(epoch)
+        return (
+            f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}"
+            f"T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}Z"
+        )
+
+    @staticmethod
+    def _batch_event_ids(count: int) -> List[str]:
+        # One os.urandom call for the whole batch, formatted as UUID4
+        # strings (version/variant bits set) via C-level bytes.hex --
+        # much cheaper than count uuid.uuid4() object round-trips.
+        raw = bytearray(os.urandom(16 * count))
+        ids = []
+        for i in range(0, len(raw), 16):
+            raw[i + 6] = (raw[i + 6] & 0x0F) | 0x40
+            raw[i + 8] = (raw[i + 8] & 0x3F) | 0x80
+            h = raw[i:i + 16].hex()
+            ids.append(f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}")
+        return ids
+
+    def _entity_fragment(self, entity: Dict, is_spn: bool = False) -> Dict:
+        """Replacement values that depend only on the entity itself."""
+        if is_spn:
+            frag = {
+                "user_id": entity["spn_id"],
+                "user_type": "2",
+                "user_agent": "AzureAD-Application",
+                "device_id": "spn-device",
+                "os": "Unknown",
+                "browser": "Unknown",
+                "roles": ["ServicePrincipal"],
+                "roles_json": '["ServicePrincipal"]'
+            }
+        else:
+            roles = entity.get("roles", [])
+            frag = {
+                "user_id": entity["user_id"],
+                "user_type": "10" if "guest" in roles else "0",
+                "user_agent": entity["user_agent"],
+                "device_id": entity["device_id"],
+                "os": entity["os"],
+                "browser": entity["browser"],
+                "roles": roles,
+                "roles_json": fastjson.dumps(roles)
+            }
+        frag.update({
+            "client_ip": entity["ip"],
+            "city": entity["city"],
+            "country": entity["country"],
+            "asn_number": entity["asn"],
+            "asn_name": entity["asn_name"],
+            "is_proxy": str(entity["is_proxy"]).lower(),
+            "email_sender": entity.get("email_sender", "attacker@evil.com"),
+            "email_subject": entity.get("email_subject", "Security Notice: Action Required"),
+            "email_url": entity.get("email_url", "https://login.microsoftonline.com-reset-verify.com")
+        })
+        return frag
+
+    def _replacements(
         self,
         entity: Dict,
         operation: Dict,
         timestamp: str,
         is_failure: bool = False,
         is_spn: bool = False,
-        override_app: Dict = None
+        override_app: Dict = None,
+        event_id: str = None
     ) -> Dict:
         result_status = "Failure" if is_failure else self.org_config["result_status"]
 
@@ -78,61 +366,118 @@ class EntraLogSimulator:
         app_id = self.app_id_map.get(app_display, "00000000-0000-0000-0000-000000000000")
         resource_type = self.operation_resource_map.get(operation["name"], "Unknown")
 
-        if is_spn:
-            user_id = entity["spn_id"]
-            user_type = "2"
-            user_agent = "AzureAD-Application"
-            device_id = "spn-device"
-            os = "Unknown"
-            browser = "Unknown"
-            roles = ["ServicePrincipal"]
-        else:
-            user_id = entity["user_id"]
-            roles = entity.get("roles", [])
-            user_type = "10" if "guest" in roles else "0"
-            user_agent = entity["user_agent"]
-            device_id = entity["device_id"]
-            os = entity["os"]
-            browser = entity["browser"]
+        frag = self._frag_cache.get(id(entity))
+        if frag is None:
+            frag = self._entity_fragment(entity, is_spn)
+            if id(entity) in self._spn_entity_ids:
+                self._frag_cache[id(entity)] = frag
 
         replacements = {
-            "{{ timestamp }}": timestamp,
-            "{{ operation }}": operation["name"],
-            "{{ org_id }}": self.org_config["org_id"],
-            "{{ record_type }}": str(self.org_config["record_type"]),
-            "{{ result_type }}": str(self.org_config["result_type"]),
-            "{{ user_type }}": user_type,
-            "{{ roles }}": json.dumps(roles),
-            "{{ client_ip }}": entity["ip"],
-            "{{ user_id }}": user_id,
-            "{{ workload }}": "AzureActiveDirectory",
-            "{{ result_status }}": result_status,
-            "{{ device_id }}": device_id,
-            "{{ os }}": os,
-            "{{ browser }}": browser,
-            "{{ user_agent }}": user_agent,
-            "{{ app_id }}": self.app_id_map[app_display],
-            "{{ app_display_name }}": app_display,
-            "{{ event_id }}": str(uuid.uuid4()),
-            "{{ auth_requirement }}": operation.get("auth_requirement", "None"),
-            "{{ mfa_required }}": str(operation.get("mfa_required", False)).lower(),
-            "{{ city }}": entity["city"],
-            "{{ country }}": entity["country"],
-            "{{ asn_number }}": entity["asn"],
-            "{{ asn_name }}": entity["asn_name"],
-            "{{ is_proxy }}": str(entity["is_proxy"]).lower(),
-            "{{ resource }}": resource_type,
-            "{{ email_sender }}": entity.get("email_sender", "attacker@evil.com"),
-            "{{ email_subject }}": entity.get("email_subject", "Security Notice: Action Required"),
-            "{{ email_url }}": entity.get("email_url", "https://login.microsoftonline.com-reset-verify.com")
+            **frag,
+            "timestamp": timestamp,
+            "operation": operation["name"],
+            "org_id": self.org_config["org_id"],
+            "record_type": str(self.org_config["record_type"]),
+            "result_type": str(self.org_config["result_type"]),
+            "workload": "AzureActiveDirectory",
+            "result_status": result_status,
+            "app_id": app_id,
+            "app_display_name": app_display,
+            "event_id": event_id or fast_uuid4(),
+            "auth_requirement": operation.get("auth_requirement", "None"),
+            "mfa_required": str(operation.get("mfa_required", False)).lower(),
+            "resource": resource_type
         }
-        
+        return replacements
+
+    def _render_template(
+        self,
+        entity: Dict,
+        operation: Dict,
+        timestamp: str,
+        is_failure: bool = False,
+        is_spn: bool = False,
+        override_app: Dict = None,
+        event_id: str = None
+    ) -> Dict:
+        replacements = self._replacements(
+            entity, operation, timestamp, is_failure, is_spn, override_app, event_id
+        )
+        return self._log_from(replacements)
+
+    def _render_line(
+        self,
+        entity: Dict,
+        operation: Dict,
+        timestamp: str,
+        is_failure: bool = False,
+        is_spn: bool = False,
+        override_app: Dict = None,
+        event_id: str = None
+    ) -> str:
+        replacements = self._replacements(
+            entity, operation, timestamp, is_failure, is_spn, override_app, event_id
+        )
+        return self._line_from(replacements)
+
+    def _log_from(self, replacements: Dict) -> Dict:
+        log = self._copy_skeleton()
+        for path, name in self._placeholder_paths:
+            target = log
+            for key in path[:-1]:
+                target = target[key]
+            target[path[-1]] = replacements[name]
+        return log
+
+    def _line_from(self, replacements: Dict) -> str:
+        replacements["roles"] = replacements["roles_json"]
+        return self._format_template.format_map(replacements)
 
-        filled = self.template
-        for placeholder, value in replacements.items():
-            filled = filled.replace(placeholder, str(value))
+    def _compile_fast_replacements(self):
+        # Specialized builders for the generate_logs hot loop: the is_spn
+        # and override_app branches and the org_config lookups are folded
+        # away into closure state, leaving only per-log work.
+        org_id = self.org_config["org_id"]
+        record_type = str(self.org_config["record_type"])
+        result_type = str(self.org_config["result_type"])
+        ok_status = self.org_config["result_status"]
+        app_map = self.app_id_map
+        resource_map = self.operation_resource_map
+        frag_cache = self._frag_cache
+        entity_fragment = self._entity_fragment
 
-        return json.loads(filled)
+        def common(frag, operation, timestamp, is_failure, event_id):
+            name = operation["name"]
+            app_display = operation["app_display_name"]
+            return {
+                **frag,
+                "timestamp": timestamp,
+                "operation": name,
+                "org_id": org_id,
+                "record_type": record_type,
+                "result_type": result_type,
+                "workload": "AzureActiveDirectory",
+                "result_status": "Failure" if is_failure else ok_status,
+                "app_id": app_map.get(app_display, "00000000-0000-0000-0000-000000000000"),
+                "app_display_name": app_display,
+                "event_id": event_id,
+                "auth_requirement": operation.get("auth_requirement", "None"),
+                "mfa_required": str(operation.get("mfa_required", False)).lower(),
+                "resource": resource_map.get(name, "Unknown")
+            }
+
+        def user_replacements(entity, operation, timestamp, is_failure, event_id):
+            # users are fragment-cached eagerly at init
+            return common(frag_cache[id(entity)], operation, timestamp, is_failure, event_id)
+
+        def spn_replacements(entity, operation, timestamp, is_failure, event_id):
+            frag = frag_cache.get(id(entity))
+            if frag is None:
+                frag = entity_fragment(entity, True)
+                frag_cache[id(entity)] = frag
+            return common(frag, operation, timestamp, is_failure, event_id)
+
+        return user_replacements, spn_replacements
 
     def generate_logs(
         self,
@@ -144,57 +489,201 @@ class EntraLogSimulator:
         force_operation: str = None,
         is_attack: bool = False
     ) -> List[Dict]:
+        return list(self.iter_logs(
+            total_logs=total_logs,
+            simulate_start_time=simulate_start_time,
+            include_failures=include_failures,
+            force_user=force_user,
+            force_app=force_app,
+            force_operation=force_operation,
+            is_attack=is_attack
+        ))
+
+    def _config_paths(self) -> Dict:
+        return {
+            "users_file": self.users_file,
+            "service_principals_file": self.service_principals_file,
+            "template_file": self.template_file,
+            "org_config_file": self.org_config_file,
+            "apps_file": self.apps_file,
+            "operations_file": self.operations_file,
+            "output_file": self.output_file
+        }
+
+    def generate_logs_parallel(
+        self,
+        total_logs: int,
+        output_file: str = None,
+        workers: int = None,
+        simulate_start_time=None,
+        include_failures=False,
+        force_user: str = None,
+        force_app: str = None,
+        force_operation: str = None
+    ) -> int:
+        """Shard total_logs across worker processes, each writing its own
+        .partN file, then concatenate the shards into output_file.
+
+        Log generation is independent per index, so this scales close to
+        linearly with cores. Each shard's start time is offset by the mean
+        inter-log gap (30s), but every shard walks its own uniform(15,45)
+        deltas, so timestamps are only approximately ordered across shard
+        boundaries (seams can jump backwards by a minute or two). Callers
+        needing the strict monotonic order of generate_logs should use
+        that path instead.
+        """
+        output_file = output_file or self.output_file
+        workers = workers or os.cpu_count() or 1
+        if simulate_start_time is None:
+            simulate_start_time = datetime.now(timezone.utc)
+
+        chunk = -(-total_logs // workers)  # ceil division
+        jobs = []
+        produced = 0
+        for i in range(workers):
+            shard_logs = min(chunk, total_logs - produced)
+            if shard_logs <= 0:
+                break
+            jobs.append((
+                self._config_paths(),
+                f"{output_file}.part{i}",
+                shard_logs,
+                simulate_start_time + timedelta(seconds=30 * produced),
+                include_failures,
+                force_user,
+                force_app,
+                force_operation
+            ))
+            produced += shard_logs
+
+        with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+            list(executor.map(_write_log_shard, jobs))
+
+        with open(output_file, "wb") as out:
+            for job in jobs:
+                shard_path = job[1]
+                with open(shard_path, "rb") as shard:
+                    shutil.copyfileobj(shard, out, 1024 * 1024)
+                os.remove(shard_path)
+
+        return produced
+
+    def iter_log_lines(self, **kwargs):
+        """Like iter_logs, but yields serialized JSONL lines (no newline).
+
+        Skips the per-log dict build and dumps entirely; each line comes
+        from a single str.format_map on the precompiled template.
+        """
+        return self.iter_logs(line_mode=True, **kwargs)
+
+    def iter_logs(
+        self,
+        total_logs: int = 50,
+        simulate_start_time=None,
+        include_failures=False,
+        force_user: str = None,
+        force_app: str = None,
+        force_operation: str = None,
+        is_attack: bool = False,
+        line_mode: bool = False
+    ):
         if simulate_start_time is None:
             simulate_start_time = datetime.now(timezone.utc)
 
-        logs = []
-        current_time = simulate_start_time
+        forced_entity = None
+        if force_user:
+            forced_entity = self._user_index.get(force_user)
+            if not forced_entity:
+                raise ValueError(f"User '{force_user}' not found.")
+
+        forced_operation = None
+        if force_operation:
+            forced_operation = next((op for op in self.operations if op["name"] == force_operation), None)
+            if not forced_operation:
+                raise ValueError(f"Operation '{force_operation}' not found.")
+
+        user_ops = self._user_ops
+        spn_ops = self._spn_ops
+
+        # Draw every random decision up front in a few C-level batches
+        # instead of one interpreter round-trip per draw per log. With no
+        # SPN operations configured, the old loop skipped every SPN draw,
+        # so all logs came from users; mirror that here.
+        if force_user or not spn_ops:
+            spn_flags = [False] * total_logs
+        else:
+            spn_flags = random.choices([True, False], weights=[0.2, 0.8], k=total_logs)
 
-        while len(logs) < total_logs:
-            is_spn = random.random() < 0.2
+        user_picks = random.choices(self.users, k=total_logs)
+        spn_picks = (
+            random.choices(self.service_principals, k=total_logs)
+            if any(spn_flags) else []
+        )
+        if not forced_operation:
+            user_op_picks = random.choices(user_ops, k=total_logs) if user_ops else []
+            spn_op_picks = random.choices(spn_ops, k=total_logs) if spn_ops else []
+        deltas = random.choices(range(15, 46), k=total_logs)
+        fail_draws = random.choices([True, False], weights=[0.15, 0.85], k=total_logs)
+        event_ids = self._batch_event_ids(total_logs)
 
-            if force_user:
-                entity = next((u for u in self.users if u["user_id"] == force_user), None)
-                if not entity:
-                    raise ValueError(f"User '{force_user}' not found.")
-                is_spn = False
+        override_app = {"app_display_name": force_app} if force_app else None
+        finish = self._line_from if line_mode else self._log_from
+
+        # Advance time as plain epoch-second integers; log k sits at the
+        # accumulated delta offset, formatted by the fixed-layout helper.
+        start_epoch = calendar.timegm(simulate_start_time.utctimetuple())
+        offsets = [0] + list(itertools.accumulate(deltas[:-1]))
+
+        for k in range(total_logs):
+            is_spn = spn_flags[k]
+
+            if forced_entity:
+                entity = forced_entity
             elif is_spn:
-                entity = random.choice(self.service_principals)
+                entity = spn_picks[k]
             else:
-                entity = random.choice(self.users)
+                entity = user_picks[k]
 
-            if force_operation:
-                operation = next((op for op in self.operations if op["name"] == force_operation), None)
-                if not operation:
-                    raise ValueError(f"Operation '{force_operation}' not found.")
+            if forced_operation:
+                operation = forced_operation
             else:
-                ops_pool = [
-                    op for op in self.operations
-                    if ("ServicePrincipal" in op["name"]) == is_spn
-                ]
-                if not ops_pool:
-                    continue
-                operation = random.choice(ops_pool)
+                operation = spn_op_picks[k] if is_spn else user_op_picks[k]
 
-            timestamp = current_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+            timestamp = self._format_utc(start_epoch + offsets[k])
 
             is_failure = (
                 include_failures
                 and operation["name"] == "InteractiveUserSignIn"
                 and not is_spn
-                and random.random() < 0.15
+                and fail_draws[k]
             )
 
-            log = self._render_template(
-                entity=entity,
-                operation=operation,
-                timestamp=timestamp,
-                is_failure=is_failure,
-                is_spn=is_spn,
-                override_app={"app_display_name": force_app} if force_app else None
-            )
+            if override_app is None:
+                build = self._spn_replacements if is_spn else self._user_replacements
+                replacements = build(
+                    entity, operation, timestamp, is_failure, event_ids[k]
+                )
+            else:
+                replacements = self._replacements(
+                    entity, operation, timestamp, is_failure, is_spn,
+                    override_app, event_ids[k]
+                )
+
+            yield finish(replacements)
 
-            logs.append(log)
-            current_time += timedelta(seconds=random.randint(15, 45))
 
-        return logs
+def _write_log_shard(job):
+    (config, shard_path, total_logs, start_time,
+     include_failures, force_user, force_app, force_operation) = job
+    simulator = EntraLogSimulator(**config)
+    with open(shard_path, "w", buffering=1024 * 1024, encoding="utf-8", newline="\n") as f:
+        for line in simulator.iter_log_lines(
+            total_logs=total_logs,
+            simulate_start_time=start_time,
+            include_failures=include_failures,
+            force_user=force_user,
+            force_app=force_app,
+            force_operation=force_operation
+        ):
+            f.write(line)
+            f.write("\n")
@@ -0,0 +1,82 @@
+"""Batched file writes with an optional io_uring fast path.
+
+When the liburing bindings are installed (Linux only), serialized lines
+are submitted as batches of write SQEs and flushed with one
+io_uring_submit per batch, amortizing syscall cost across the batch.
+Everywhere else this falls back to writelines on a 1 MiB buffered
+handle, which already coalesces lines into large write syscalls.
+
+The fast path is written against the liburing 2024.x function API; the
+2026.x releases replaced it with a Ring class. The probe below checks
+for the symbols we actually call, so an incompatible install degrades
+to the buffered fallback instead of failing mid-run.
+"""
+
+import os
+
+try:
+    import liburing
+except ImportError:
+    liburing = None
+else:
+    _LIBURING_API = (
+        "io_uring", "io_uring_cqe", "io_uring_queue_init",
+        "io_uring_queue_exit", "io_uring_get_sqe", "io_uring_prep_write",
+        "io_uring_submit", "io_uring_wait_cqe", "io_uring_cqe_seen",
+    )
+    if not all(hasattr(liburing, name) for name in _LIBURING_API):
+        liburing = None
+
+# SQEs submitted per io_uring_enter; matches the 16-32 sweet spot from
+# the io_uring batching literature.
+_BATCH_SQES = 32
+
+
+def write_lines(path, lines, append=False):
+    """Write an iterable of bytes lines (newline included) to path."""
+    if liburing is None:
+        with open(path, "ab" if append else "wb", buffering=1024 * 1024) as f:
+            f.writelines(lines)
+        return
+
+    flags = os.O_WRONLY | os.O_CREAT | (os.O_APPEND if append else os.O_TRUNC)
+    fd = os.open(path, flags, 0o644)
+    ring = liburing.io_uring()
+    try:
+        liburing.io_uring_queue_init(_BATCH_SQES, ring, 0)
+        offset = os.lseek(fd, 0, os.SEEK_END) if append else 0
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) == _BATCH_SQES:
+                offset = _submit_batch(ring, fd, batch, offset)
+                batch = []
+        if batch:
+            _submit_batch(ring, fd, batch, offset)
+    finally:
+        liburing.io_uring_queue_exit(ring)
+        os.close(fd)
+
+
+def _submit_batch(ring, fd, batch, offset):
+    # The batch list keeps every buffer alive until its CQE is reaped.
+    for line in batch:
+        sqe = liburing.io_uring_get_sqe(ring)
+        liburing.io_uring_prep_write(sqe, fd, line, len(line), offset)
+        # Completions arrive in any order; carry the expected length so
+        # each one can be checked against what was actually written.
+        sqe.user_data = len(line)
+        offset += len(line)
+    liburing.io_uring_submit(ring)
+    cqe = liburing.io_uring_cqe()
+    for _ in batch:
+        liburing.io_uring_wait_cqe(ring, cqe)
+        res, expected = cqe.res, cqe.user_data
+        liburing.io_uring_cqe_seen(ring, cqe)
+        if res < 0:
+            raise OSError(-res, os.strerror(-res))
+        if res != expected:
+            # Mirror the buffered fallback, which raises rather than
+            # leaving a silently truncated file behind.
+            raise OSError(f"short io_uring write: {res} of {expected} bytes")
+    return offset
@@ -0,0 +1,41 @@
+# fastjson.py
+#
+# JSON shim for the simulator scripts: orjson's C-level serializer when it
+# is installed, ujson as a middle tier for boxes where orjson can't build,
+# stdlib json (compact separators) as the last resort. Import `dumps` /
+# `loads` from here instead of binding to a specific library; the binding
+# happens once at import, so there is no per-call dispatch cost.
+
+try:
+    import orjson
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    def dumps_bytes(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    loads = orjson.loads
+
+except ImportError:
+    try:
+        import ujson
+
+        def dumps(obj) -> str:
+            return ujson.dumps(obj)
+
+        def dumps_bytes(obj) -> bytes:
+            return ujson.dumps(obj).encode()
+
+        loads = ujson.loads
+
+    except ImportError:
+        import json
+
+        def dumps(obj) -> str:
+            return json.dumps(obj, separators=(",", ":"))
+
+        def dumps_bytes(obj) -> bytes:
+            return json.dumps(obj, separators=(",", ":")).encode()
+
+        loads = json.loads
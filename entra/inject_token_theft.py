@@ -1,18 +1,19 @@
 import argparse
-import json
+from collections import ChainMap
 from datetime import datetime, timedelta, timezone
-from entra_simulator import EntraLogSimulator
+from entra_simulator import EntraLogSimulator, iso_utc
+from fastjson import dumps
 
 def generate_token_theft_logs(simulator, username, output_path):
-    # Find matching user from users.yaml
-    user = next((u for u in simulator.users if u["user_id"] == username), None)
+    # Find matching user from users.yaml (O(1) index lookup)
+    user = simulator._user_index.get(username)
     if not user:
         raise ValueError(f"User '{username}' not found in users.yaml")
 
     # Time logic: token first, then sign-in 3 minutes later
     now = datetime.now(timezone.utc)
-    token_ts = now.strftime("%Y-%m-%dT%H:%M:%SZ")
-    signin_ts = (now + timedelta(minutes=3)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    token_ts = iso_utc(now)
+    signin_ts = iso_utc(now + timedelta(minutes=3))
 
     # Operation templates
     token_op = next(op for op in simulator.operations if op["name"] == "TokenIssued")
@@ -27,9 +28,9 @@ def generate_token_theft_logs(simulator, username, output_path):
         is_spn=False
     )
 
-    # Step 2: Malicious follow-up login (different IP & OS)
-    attacker = user.copy()
-    attacker.update({
+    # Step 2: Malicious follow-up login (different IP & OS) -- attacker
+    # overrides layered on top of the user without copying it
+    attacker = ChainMap({
         "ip": "203.0.113.99",  # Anomalous IP
         "os": "Kali Linux",    # Anomalous OS
         "browser": "Unknown",
@@ -40,7 +41,7 @@ def generate_token_theft_logs(simulator, username, output_path):
         "asn": "AS12389",
         "asn_name": "Rostelecom",
         "is_proxy": True
-    })
+    }, user)
 
     signin_log = simulator._render_template(
         entity=attacker,
@@ -50,10 +51,12 @@ def generate_token_theft_logs(simulator, username, output_path):
         is_spn=False
     )
 
-    # Write logs
-    with open(output_path, "w") as f:
-        f.write(json.dumps(token_log) + "\n")
-        f.write(json.dumps(signin_log) + "\n")
+    # Write logs as one batched payload
+    payload = "\n".join(
+        dumps(log) for log in (token_log, signin_log)
+    ) + "\n"
+    with open(output_path, "w", buffering=1024 * 1024, encoding="utf-8", newline="\n") as f:
+        f.write(payload)
 
     print(f"[+] Token theft simulation for {username} written to: {output_path}")
 
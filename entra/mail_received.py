@@ -1,21 +1,25 @@
 #!/usr/bin/env python3
 import argparse
-import json
-import uuid
 import hashlib
+from collections import ChainMap
+from functools import lru_cache
 from datetime import datetime, timedelta, timezone
-from entra_simulator import EntraLogSimulator
+from entra_simulator import EntraLogSimulator, iso_utc, fast_uuid4
+from fastjson import dumps
 
 EXCHANGE_ONLINE_APP_ID = "029f5f70-1642-2096-26f6-00cc4012391f"
 EXCHANGE_ONLINE_APP_NAME = "Exchange Online"
 
 def iso_utc_now_minus(hours: int) -> str:
-    ts = datetime.now(timezone.utc) - timedelta(hours=hours)
-    return ts.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return iso_utc(datetime.now(timezone.utc) - timedelta(hours=hours))
 
+@lru_cache(maxsize=1024)
 def safe_hashes(seed: str):
-    md5 = hashlib.md5(seed.encode("utf-8")).hexdigest()
-    sha256 = hashlib.sha256(seed.encode("utf-8")).hexdigest()
+    # Encode once for both digests; memoized so batch callers reusing the
+    # same subject/url/filename combination pay for the hashing only once.
+    data = seed.encode("utf-8")
+    md5 = hashlib.md5(data).hexdigest()
+    sha256 = hashlib.sha256(data).hexdigest()
     return md5, sha256
 
 def build_email_block(
@@ -31,7 +35,7 @@ def build_email_block(
     attach_size: int = 4821,
     return_path: str = "<bounce@contoso.com>",
 ) -> dict:
-    message_id = f"<{uuid.uuid4()}@security.microsoft.com>"
+    message_id = f"<{fast_uuid4()}@security.microsoft.com>"
     data_body = (
         f"Heads up! We detected an unusual sign-in attempt.\n\n"
         f"Review: {url}\n"
@@ -109,19 +113,18 @@ def main():
         output_file=args.output
     )
 
-    # Get user
-    user = next((u for u in simulator.users if u["user_id"] == args.username), None)
+    # Get user (O(1) index lookup)
+    user = simulator._user_index.get(args.username)
     if not user:
         raise ValueError(f"User '{args.username}' not found in users.yaml")
 
     # Compose the content we want to inject into the template
     # (We still let the simulator render core/existing fields, then enrich.)
-    user_for_render = user.copy()
-    user_for_render.update({
+    user_for_render = ChainMap({
         "email_sender": args.sender,
         "email_subject": args.subject,
         "email_url": args.url
-    })
+    }, user)
 
     # Locate the MailReceived operation
     mail_op = next((op for op in simulator.operations if op["name"] == "MailReceived"), None)
@@ -185,8 +188,8 @@ def main():
     ])
 
     # Write JSONL
-    with open(args.output, "w") as f:
-        f.write(json.dumps(log) + "\n")
+    with open(args.output, "w", buffering=1024 * 1024, encoding="utf-8", newline="\n") as f:
+        f.write(dumps(log) + "\n")
 
     print(f"[+] Phishing mail log injected for {args.username} at {iso_timestamp}")
 
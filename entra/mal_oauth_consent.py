@@ -1,105 +1,223 @@
 import argparse
-import json
-import uuid
-from datetime import datetime, timezone
+import hashlib
+import types
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+from fastjson import dumps_bytes
 
 try:
-    from entra_simulator import EntraLogSimulator
+    import msgspec  # optional: schema-aware structs encode without dict traversal
 except ImportError:
-    print("Warning: EntraLogSimulator class not found. Using a placeholder for initialization.")
-    class EntraLogSimulator:
-        def __init__(self, **kwargs):
-            self.users = [{
-                "user_id": "admin1@contoso.com",
-                "ip": "44.192.30.81", 
-                "display_name": "Admin One"
-            }]
-
-def generate_flat_oauth_consent_log(username, output_path, simulator):
+    msgspec = None
+
+try:
+    from entra_simulator import load_users, iso_utc, fast_uuid4
+except ImportError:
+    import uuid
+    print("Warning: entra_simulator module not found. Using a placeholder user list.")
+    def load_users(users_file=None):
+        return [{
+            "user_id": "admin1@contoso.com",
+            "ip": "44.192.30.81",
+            "display_name": "Admin One"
+        }]
+    def iso_utc(dt):
+        return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+    def fast_uuid4():
+        return str(uuid.uuid4())
+
+OAUTH_APP_ID = "10000000-dead-beef-baad-ph1shp0rtal"
+OAUTH_APP_NAME = "Contoso Phish Portal"
+OAUTH_SCOPES = "Mail.ReadWrite, offline_access, MailboxSettings.ReadWrite"
+
+# Constant fields of the consent record, built once at import. Per-call
+# code overlays only the varying fields (_time, Id, ClientIP, UserId);
+# the None placeholders keep those keys in their usual positions.
+_OAUTH_CONSENT_TEMPLATE = {
+    "_time": None,
+    "Id": None,
+    "Operation": "ConsentToApp",
+    "OrganizationId": "67aaf9b4-57b8-4ca6-b68c-2274d63ff1b0",
+    "RecordType": 15,
+    "ResultType": 0,
+    "UserType": 0,
+    "Roles": ["employee"],
+    "ClientIP": None,
+    "UserId": None,
+    "Workload": "AzureActiveDirectory",
+    "ResultStatus": "Success",
+    "DeviceDetail": {
+        "DeviceId": "device-phish-consent",
+        "OperatingSystem": "Windows 10",
+        "Browser": "Chrome"
+    },
+    "UserAgent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.88 Safari/537.36",
+    "AppId": OAUTH_APP_ID,
+    "AppDisplayName": OAUTH_APP_NAME,
+    "AdditionalDetails": [
+        {"Key": "AuthenticationRequirement", "Value": "SingleFactorAuthentication"},
+        {"Key": "MfaRequired", "Value": "false"},
+        {"Key": "RequestedScopes", "Value": OAUTH_SCOPES},
+        {"Key": "ConsentType", "Value": "User"}
+    ],
+    "GeoLocation": {"Country": "US", "City": "Dallas"},
+    "ASN": {"ASN": "AS7018", "ASN_Name": "ATT-INTERNET4", "IsProxy": "false"},
+    "Resource": "Application",
+    "ScopeDetails": OAUTH_SCOPES
+}
+
+
+if msgspec is not None:
+    class OAuthConsentLog(msgspec.Struct, rename={"time": "_time"}):
+        """Flat-M365 consent record with compile-time-known shape.
+
+        Struct instances use slot storage and the msgspec encoder walks
+        the declared fields directly, so bulk emission skips both the
+        per-record dict and its hash-based traversal.
+        """
+        time: str
+        Id: str
+        Operation: str
+        OrganizationId: str
+        RecordType: int
+        ResultType: int
+        UserType: int
+        Roles: list
+        ClientIP: str
+        UserId: str
+        Workload: str
+        ResultStatus: str
+        DeviceDetail: dict
+        UserAgent: str
+        AppId: str
+        AppDisplayName: str
+        AdditionalDetails: list
+        GeoLocation: dict
+        ASN: dict
+        Resource: str
+        ScopeDetails: str
+
+    _CONST_FIELDS = {
+        k: v for k, v in _OAUTH_CONSENT_TEMPLATE.items() if v is not None
+    }
+    _encode = msgspec.json.Encoder().encode
+else:
+    _encode = dumps_bytes
+
+
+# Frozen fallback identity for usernames missing from users.yaml; the
+# proxy guards against accidental mutation and the per-miss {**...} merge
+# is a single C-level dict build.
+_DEFAULT_USER = types.MappingProxyType({
+    "user_id": None,
+    "ip": "44.192.30.81",
+    "display_name": None,
+})
+
+
+@lru_cache(maxsize=4096)
+def _user_digest(username: str) -> bytes:
+    # Stable across interpreter runs (unlike built-in hash(), which is
+    # randomized by PYTHONHASHSEED) and memoized so repeated emits for the
+    # same username hash only once.
+    return hashlib.blake2b(username.encode("utf-8"), digest_size=8).digest()
+
+
+def _build_flat_m365(username, user, consent_ts):
     """
-    Generates a high-fidelity, FLAT-SCHEMA Microsoft 365 Audit Log 
+    Builds a high-fidelity, FLAT-SCHEMA Microsoft 365 Audit Log record
     for an OAuth consent event that matches the XDM rule expectations.
     """
-    
-    user = next((u for u in simulator.users if u.get("user_id") == username), None)
+    if msgspec is not None:
+        return OAuthConsentLog(
+            time=consent_ts,
+            Id=fast_uuid4(),
+            ClientIP=user.get("ip"),
+            UserId=username,
+            **_CONST_FIELDS
+        )
+    return _OAUTH_CONSENT_TEMPLATE | {
+        "_time": consent_ts,
+        "Id": fast_uuid4(),
+        "ClientIP": user.get("ip"),
+        "UserId": username
+    }
+
+
+# Schema name -> builder taking (username, user, consent_ts). Adding a
+# variant (e.g. the nested Entra shape) means one builder function here;
+# user lookup, timestamping, and the write stay shared.
+SCHEMAS = {
+    "flat-m365": _build_flat_m365,
+}
+
+
+def generate_oauth_consent_log(username, out, user_index, schema="flat-m365",
+                               consent_time=None):
+    """Emit one consent record to `out`, an open binary writer.
+
+    Taking the writer instead of a path lets orchestration code keep one
+    BufferedWriter alive across many emissions rather than paying an
+    open+truncate+close per record.
+    """
+    user = user_index.get(username)
     if not user:
+        # Derive the synthetic identity from a deterministic digest so
+        # unknown users get stable, distinguishable fields on every run.
+        digest = _user_digest(username)
         user = {
+            **_DEFAULT_USER,
             "user_id": username,
-            "ip": "44.192.30.81", 
-            "display_name": username.split('@')[0].capitalize(),
+            "ip": f"44.192.{digest[0]}.{digest[1]}",
+            "display_name": username.partition('@')[0].capitalize(),
         }
         print(f"Warning: User '{username}' not found. Using default context.")
 
-    # Time logic
-    consent_dt = datetime.now(timezone.utc)
-    consent_ts = consent_dt.strftime("%Y-%m-%dT%H:%M:%SZ") 
-
-    OAUTH_APP_ID = "10000000-dead-beef-baad-ph1shp0rtal" 
-    OAUTH_APP_NAME = "Contoso Phish Portal"              
-    OAUTH_SCOPES = "Mail.ReadWrite, offline_access, MailboxSettings.ReadWrite"
-    
-    
-    log_entry = {
-      "_time": consent_ts, 
-      "Id": str(uuid.uuid4()),
-      "Operation": "ConsentToApp",
-      "OrganizationId": "67aaf9b4-57b8-4ca6-b68c-2274d63ff1b0",
-      "RecordType": 15,
-      "ResultType": 0,
-      "UserType": 0,
-      "Roles": ["employee"], 
-      "ClientIP": user.get("ip"), 
-      "UserId": username,         
-      "Workload": "AzureActiveDirectory",
-      "ResultStatus": "Success",  
-      "DeviceDetail": {           
-        "DeviceId": "device-phish-consent",
-        "OperatingSystem": "Windows 10",
-        "Browser": "Chrome"
-      }, 
-      "UserAgent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.88 Safari/537.36",
-      "AppId": OAUTH_APP_ID,
-      "AppDisplayName": OAUTH_APP_NAME,
-      "AdditionalDetails": [
-        {"Key": "AuthenticationRequirement", "Value": "SingleFactorAuthentication"}, 
-        {"Key": "MfaRequired", "Value": "false"},
-        {"Key": "RequestedScopes", "Value": OAUTH_SCOPES}, 
-        {"Key": "ConsentType", "Value": "User"}
-      ], 
-      "GeoLocation": {"Country": "US", "City": "Dallas"},
-      "ASN": {"ASN": "AS7018", "ASN_Name": "ATT-INTERNET4", "IsProxy": "false"},
-      "Resource": "Application",
-      "ScopeDetails": OAUTH_SCOPES
-    }
-    
-    with open(output_path, "w") as f:
-        f.write(json.dumps(log_entry) + "\n")
+    # Time logic: batch callers capture the clock once and pass offset
+    # datetimes in; a bare call still reads the clock itself.
+    if consent_time is None:
+        consent_time = datetime.now(timezone.utc)
+    consent_ts = iso_utc(consent_time)
 
-    print(f"[+] Malicious OAuth Consent log for {username} written to: {output_path}")
+    log_entry = SCHEMAS[schema](username, user, consent_ts)
+    out.write(_encode(log_entry) + b"\n")
+
+    print(f"[+] Malicious OAuth Consent log for {username} written to: {getattr(out, 'name', '<stream>')}")
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Inject a targeted OAuth consent simulation log (Flat Schema).")
-    parser.add_argument("--username", 
-                        default="admin1@contoso.com", 
-                        help="User email to simulate attack for (defaults to admin1@contoso.com)")
-    parser.add_argument("--output", 
-                        default="/home/spen/threat_emulation/o365/mal_oauth_consent.jsonl", 
+    parser = argparse.ArgumentParser(description="Inject a targeted OAuth consent simulation log.")
+    parser.add_argument("--username",
+                        action="append",
+                        help="User email to simulate attack for; repeatable (defaults to admin1@contoso.com)")
+    parser.add_argument("--output",
+                        default="/home/spen/threat_emulation/o365/mal_oauth_consent.jsonl",
                         help="Output path for the logs")
+    parser.add_argument("--schema",
+                        default="flat-m365",
+                        choices=sorted(SCHEMAS),
+                        help="Output record schema (defaults to flat-m365)")
+    parser.add_argument("--append",
+                        action="store_true",
+                        help="Append to the output file instead of truncating it")
     args = parser.parse_args()
 
-    
-    simulator = EntraLogSimulator(
-        users_file="/home/spen/entra_logs/configs/users.yaml",
-        service_principals_file="/home/spen/entra_logs/configs/service_principals.yaml",
-        template_file="/home/spen/entra_logs/templates/entra_template.json",
-        org_config_file="/home/spen/entra_logs/configs/org_config.yaml",
-        apps_file="/home/spen/entra_logs/configs/apps.yaml",
-        operations_file="/home/spen/entra_logs/configs/operations.yaml",
-        output_file=args.output
-    )
-
-    generate_flat_oauth_consent_log(args.username, args.output, simulator)
+    # No schema here touches the template, so only users.yaml is
+    # parsed -- no full EntraLogSimulator construction on this path.
+    users = load_users("/home/spen/entra_logs/configs/users.yaml")
+    user_index = {u.get("user_id"): u for u in users}
+
+    # One clock read for the whole batch; records get microsecond offsets
+    # so ordering stays stable without N clock_gettime calls.
+    usernames = args.username or ["admin1@contoso.com"]
+    base_time = datetime.now(timezone.utc)
+    with open(args.output, "ab" if args.append else "wb", buffering=1 << 20) as out:
+        for i, username in enumerate(usernames):
+            generate_oauth_consent_log(
+                username, out, user_index, args.schema,
+                consent_time=base_time + timedelta(microseconds=i)
+            )
 
 if __name__ == "__main__":
     main()
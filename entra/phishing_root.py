@@ -1,28 +1,78 @@
 import argparse
 from datetime import datetime, timedelta, timezone
+from multiprocessing import Pool
+
+import fastio
 from entra_simulator import EntraLogSimulator
-import json
+from fastjson import dumps_bytes
+
+# Warm per-process state for the worker pool; the simulator is not
+# picklable (compiled closures), so each worker builds its own once.
+_worker_sim = None
+_worker_time = None
+
+
+def _init_worker(config_paths, simulate_time):
+    global _worker_sim, _worker_time
+    _worker_sim = EntraLogSimulator(**config_paths)
+    _worker_time = simulate_time
+
+
+def _emit_one(username):
+    log = next(_worker_sim.iter_logs(
+        total_logs=1,
+        simulate_start_time=_worker_time,
+        force_user=username,
+        force_app="Contoso Phish Portal",
+        force_operation="ConsentToApp",
+        is_attack=True
+    ))
+    return dumps_bytes(log) + b"\n"
+
 
 def main():
     parser = argparse.ArgumentParser(description="Inject phishing root cause logs.")
-    parser.add_argument("--username", required=True, help="User email to simulate attack for (must match users.yaml)")
+    parser.add_argument("--username", help="User email to simulate attack for (must match users.yaml)")
+    parser.add_argument("--users-file", help="Newline-separated usernames; one log per user, sharded across workers")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --users-file mode (default: cpu count)")
     parser.add_argument("--output", required=True, help="Output .jsonl file path")
     parser.add_argument("--offset-minutes", type=int, default=60, help="Minutes before now to inject log")
 
     args = parser.parse_args()
+    if not args.username and not args.users_file:
+        parser.error("one of --username or --users-file is required")
     simulate_time = datetime.now(timezone.utc) - timedelta(minutes=args.offset_minutes)
 
-    simulator = EntraLogSimulator(
-        users_file="/home/spen/entra_logs/configs/users.yaml",
-        service_principals_file="/home/spen/entra_logs/configs/service_principals.yaml",
-        template_file="/home/spen/entra_logs/templates/entra_template.json",
-        org_config_file="/home/spen/entra_logs/configs/org_config.yaml",
-        apps_file="/home/spen/entra_logs/configs/apps.yaml",
-        operations_file="/home/spen/entra_logs/configs/operations.yaml",
-        output_file=args.output
-    )
+    config_paths = {
+        "users_file": "/home/spen/entra_logs/configs/users.yaml",
+        "service_principals_file": "/home/spen/entra_logs/configs/service_principals.yaml",
+        "template_file": "/home/spen/entra_logs/templates/entra_template.json",
+        "org_config_file": "/home/spen/entra_logs/configs/org_config.yaml",
+        "apps_file": "/home/spen/entra_logs/configs/apps.yaml",
+        "operations_file": "/home/spen/entra_logs/configs/operations.yaml",
+        "output_file": args.output
+    }
+
+    if args.users_file:
+        with open(args.users_file, "r", encoding="utf-8") as f:
+            usernames = [line.strip() for line in f if line.strip()]
+
+        # Each worker holds a warm simulator; imap_unordered streams the
+        # serialized lines back so workers stay saturated while the parent
+        # writes. Per-user generation is independent, so order is free.
+        with Pool(args.workers, initializer=_init_worker,
+                  initargs=(config_paths, simulate_time)) as pool:
+            fastio.write_lines(
+                args.output,
+                pool.imap_unordered(_emit_one, usernames, chunksize=64)
+            )
+
+        print(f"[+] Injected phishing root cause at {simulate_time.isoformat()} for {len(usernames)} users into {args.output}")
+        return
+
+    simulator = EntraLogSimulator(**config_paths)
 
-    logs = simulator.generate_logs(
+    logs = simulator.iter_logs(
         total_logs=1,
         simulate_start_time=simulate_time,
         force_user=args.username,
@@ -31,9 +81,10 @@ def main():
         is_attack=True
     )
 
-    with open(args.output, "w") as f:
-        for log in logs:
-            f.write(f"{json.dumps(log)}\n")
+    # fastio batches the writes (io_uring SQE batches when liburing is
+    # installed, buffered writelines otherwise) while the generator keeps
+    # serialization and disk writes pipelined.
+    fastio.write_lines(args.output, (dumps_bytes(log) + b"\n" for log in logs))
 
     print(f"[+] Injected phishing root cause at {simulate_time.isoformat()} for {args.username} into {args.output}")
 